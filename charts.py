@@ -6,6 +6,7 @@ import warnings
 import data
 from data import dframe, map_dframe, hvac_types, corrective_types
 from data import preventative_types, weekday_name, get_fiscalyear, month_name
+from data import weekday_name_series, month_name_series
 import plotly.graph_objs as go
 import numpy as np
 from sklearn import preprocessing
@@ -352,8 +353,7 @@ def weekday_completion(dframe, z_values='count',colorscale='Portland'):
 
     # filter out still open work orders
     df = dframe[dframe['date_completed'].notnull()]
-    df['completed_day_name'] = (df['date_completed'].
-                                apply(lambda x: weekday_name(x.dayofweek)))
+    df['completed_day_name'] = weekday_name_series(df['date_completed'])
 
     z_dict = {}
     x = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
@@ -446,9 +446,8 @@ def month_completion(dframe, z_values='count',colorscale='Portland'):
     """
 
     # filter out still open work orders
-    df = dframe[dframe['date_completed'].notnull()]    
-    df['completed_month_name'] = (df['date_completed'].
-                                  apply(lambda x: month_name(x.month)))
+    df = dframe[dframe['date_completed'].notnull()]
+    df['completed_month_name'] = month_name_series(df['date_completed'])
 
     z_dict = {}
     x = ['January','February','March','April','May','June','July','August',
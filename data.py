@@ -1,13 +1,29 @@
+import os
+
 import datadotworld as dw
 import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 ################################################################################
 ################################################################################
                             ## HELPER FUNCTIONS ##
 ################################################################################
 ################################################################################
 
+## name tables kept as numpy arrays so the series functions below can
+## gather labels for a whole column with one fancy-index operation
+_DAY_NAMES = np.array(["Monday","Tuesday","Wednesday","Thursday",
+                       "Friday","Saturday","Sunday"])
+_MONTH_NAMES = np.array(['January','February','March','April','May','June',
+                         'July','August','September','October','November',
+                         'December'])
+
+
 def weekday_name(integer):
     """Convert integer from 0-6 to return corresponding weekday name.
 
@@ -27,9 +43,30 @@ def weekday_name(integer):
     -------
     >>> weekday_name(3)  # returns Thursday
     """
-    day_names = ("Monday","Tuesday","Wednesday","Thursday",
-                 "Friday","Saturday","Sunday")
-    return day_names[integer]
+    return _DAY_NAMES[integer]
+
+
+def weekday_name_series(series):
+    """Convert a datetime Series to an array of weekday names.
+
+    Array-aware companion to weekday_name: instead of calling the scalar
+    function once per row through apply, the whole column of day-of-week
+    integers indexes the name table in a single numpy gather.
+
+    Parameters
+    ----------
+    series:   Pandas Series
+            a column of data type datetime.
+
+    Returns
+    -------
+    Numpy Array:  Array of weekday names, same length as series.
+
+    Example
+    -------
+    >>> weekday_name_series(df['date_completed'])  # ['Monday','Friday',...]
+    """
+    return _DAY_NAMES[series.dt.dayofweek.values]
 
 
 def month_name(integer):
@@ -54,9 +91,30 @@ def month_name(integer):
     -------
     >>> month_name(12)  # returns December
     """
-    month_names = ['January','February','March','April','May','June',
-                   'July','August','September','October','November','December']
-    return month_names[integer-1]
+    return _MONTH_NAMES[integer-1]
+
+
+def month_name_series(series):
+    """Convert a datetime Series to an array of month names.
+
+    Array-aware companion to month_name: the whole column of month
+    integers indexes the name table in a single numpy gather rather than
+    invoking the scalar function once per row.
+
+    Parameters
+    ----------
+    series:   Pandas Series
+            a column of data type datetime.
+
+    Returns
+    -------
+    Numpy Array:  Array of month names, same length as series.
+
+    Example
+    -------
+    >>> month_name_series(df['date_completed'])  # ['April','December',...]
+    """
+    return _MONTH_NAMES[series.dt.month.values - 1]
 
 
 
@@ -86,8 +144,8 @@ def get_fiscalyear(column, fiscalyear_start=7):
 
     Returns
     --------
-    Pandas Series: Series or column containing data for 4 digit number
-                   representing fiscal year.
+    Numpy Array:   Array containing data for 4 digit number representing
+                   fiscal year.
 
     Examples
     --------
@@ -99,14 +157,52 @@ def get_fiscalyear(column, fiscalyear_start=7):
     >>> get_fiscalyear(df['request_date'], 10) # October fiscal year start
     """
 
-    fiscal_year = [date.year + 1 if date.month >= fiscalyear_start
-                   else date.year for date in column]
+    ## DatetimeIndex exposes month & year directly while a Series goes
+    ## through the .dt accessor; both return int64 arrays so np.where
+    ## operates at C-level rather than looping over each Timestamp
+    if hasattr(column, 'dt'):
+        months = column.dt.month.values
+        years = column.dt.year.values
+    else:
+        months = column.month
+        years = column.year
+
+    fiscal_year = np.where(months >= fiscalyear_start, years + 1, years)
 
     return fiscal_year
 
 
 
 
+def _fiscal_years(requested_index, completed_column, fiscalyear_start=7):
+    """Compute request and completion fiscal years in one fused pass.
+
+    Stacks the month and year arrays for the request index and the
+    completion column into (2, N) arrays so the fiscal year rule runs as
+    a single np.where call for both columns instead of two independent
+    scans. Rows without a completion date receive the -1 sentinel in the
+    completion output, matching clean_data's int32 sentinel convention.
+
+    Returns a tuple of two int32 arrays:
+    (fiscal_year_requested, fiscal_year_completed).
+    """
+    completed_mask = completed_column.notna().values
+
+    months = np.vstack((requested_index.month,
+                        np.where(completed_mask,
+                                 completed_column.dt.month.values, 0)))
+    years = np.vstack((requested_index.year,
+                       np.where(completed_mask,
+                                completed_column.dt.year.values, 0)))
+
+    fiscal_years = np.where(months >= fiscalyear_start, years + 1, years)
+    fiscal_year_requested = fiscal_years[0].astype(np.int32)
+    fiscal_year_completed = np.where(completed_mask, fiscal_years[1],
+                                     -1).astype(np.int32)
+
+    return fiscal_year_requested, fiscal_year_completed
+
+
 class ValueNotTypeFloatIntListSetStr(ValueError):
     pass
 
@@ -130,12 +226,7 @@ def valid_instance(value):
     >>>       valid_instance({'name':'Joe Budden'}) # raises Error
     """
 
-    if (isinstance(value, float)  or
-        isinstance(value, int)    or
-        isinstance(value, list)   or
-        isinstance(value, set)    or
-        isinstance(value, str)):
-
+    if isinstance(value, (float, int, list, set, str)):
         return True
     else:
         ### Valid value types include: [str, int, list, float]
@@ -163,13 +254,15 @@ def container_hasvalue(container, value):
     """
     if valid_instance(value):
 
-        container = list(container)
-        container = set(container)
-
-        if value in container:
-            return True
+        ## compare against the underlying array directly; building a
+        ## list and then a set walks the column twice and allocates a
+        ## Python object per unique row just to test one value
+        if hasattr(container, 'values'):
+            arr = container.values
         else:
-            return False
+            arr = np.asarray(container)
+
+        return bool((arr == value).any())
 
     else:
         return False
@@ -288,10 +381,27 @@ def null_nonexistent(series):
     >>> null_nonexistent(dataframe.index) # returns True
 
     """
-    if series.isnull().sum() > 0:
-        return False
-    else:
-        return True
+    ## hasnans is cached on the Series/Index and avoids materializing a
+    ## full boolean mask just to count it the way isnull().sum() does
+    return not series.hasnans
+
+
+def _ontime_flags(codes, days, sums, counts):
+    """Flag workorders closed at or under the mean duration for their type.
+
+    Takes the integer group code and duration in days for every workorder
+    along with the per-group duration sums and counts, and writes the
+    ontime flag for all rows in one fused pass: mean lookup, comparison
+    and integer cast happen without intermediate columns. Compiled with
+    numba when available, otherwise runs as a plain Python loop.
+    """
+    flags = np.empty(len(days), dtype=np.int64)
+    for i in range(len(days)):
+        flags[i] = days[i] <= sums[codes[i]] / counts[codes[i]]
+    return flags
+
+if njit is not None:
+    _ontime_flags = njit(cache=True)(_ontime_flags)
 
 
 def ontime(dframe, problemtype_column='prob_type', duration_column='duration'):
@@ -307,6 +417,9 @@ def ontime(dframe, problemtype_column='prob_type', duration_column='duration'):
     closed ontime. For example, values for x, y and size of a scatter plot can be passed
     as x = ontime(dframe)[0], y = ontime(dframe)[1], size = ontime(dframe)[2]
 
+    The dataframe passed is treated as read only: all intermediate values live
+    in local arrays so repeated calls never grow the caller's frame.
+
     Parameters
     ----------
     dframe:              Pandas Dataframe
@@ -335,14 +448,34 @@ def ontime(dframe, problemtype_column='prob_type', duration_column='duration'):
     """
     if null_nonexistent(dframe[duration_column]):
         try:
-            dframe['days_integer'] = dframe[duration_column].dt.days.astype(int)
-            dframe['average_duration'] = dframe.groupby(problemtype_column)['days_integer'].transform('mean')
-            dframe['ontime'] = np.where(dframe['days_integer'] <= dframe['average_duration'], 1, 0)
-
-            avg_duration_bytype = dframe.groupby(problemtype_column)['average_duration'].mean()
-            number_ontime_bytype = dframe.groupby(problemtype_column)['ontime'].sum()
-            total_volume_bytype = dframe.groupby(problemtype_column)['ontime'].count()
-            percentage_ontime = (number_ontime_bytype / total_volume_bytype) * 100
+            ## prefer the precomputed int32 day counts from clean_data;
+            ## converting the timedelta column through .dt.days is only
+            ## needed for frames built outside this module. Day counts
+            ## stay a local array so the caller's frame is never written
+            if 'duration_days' in dframe.columns:
+                days = dframe['duration_days'].values.astype(np.int64)
+            else:
+                days = dframe[duration_column].dt.days.values.astype(np.int64)
+
+            ## factorize reduces the problem types to integer group codes
+            ## in one C pass; every per-type statistic then falls out of
+            ## a bincount scatter over those codes, with only dozens of
+            ## problem types this beats rebuilding a groupby hash table
+            codes, uniques = pd.factorize(dframe[problemtype_column], sort=True)
+            counts = np.bincount(codes, minlength=len(uniques))
+            sums = np.bincount(codes, weights=days, minlength=len(uniques))
+
+            ## kernel fuses the mean lookup and comparison in one pass
+            ## over int64 arrays instead of broadcasting a means column
+            flags = _ontime_flags(codes, days, sums, counts)
+            ontime_counts = np.bincount(codes, weights=flags,
+                                        minlength=len(uniques))
+
+            index = pd.Index(uniques, name=problemtype_column)
+            total_volume_bytype = pd.Series(counts, index=index)
+            avg_duration_bytype = pd.Series(sums / counts, index=index)
+            percentage_ontime = pd.Series(ontime_counts / counts * 100,
+                                          index=index)
 
             return (total_volume_bytype, avg_duration_bytype, percentage_ontime)
 
@@ -386,9 +519,14 @@ def remove_open_workorders(dframe, column='date_completed'):
 ################################################################################
 ################################################################################
 
-def get_data(dataset_name, dataframe_name):
+def get_data(dataset_name, dataframe_name, cache_path='data/archibus_cache.pkl',
+             refresh=False):
     """Request data from datadotworld API, and returns pandas dataframe.
 
+    The first successful request is written to a local cache file so
+    subsequent imports read the dataframe from disk instead of repeating
+    the network download and csv parse on every run.
+
     Additional information on the datadotworld api can be found at the
     following site: https://apidocs.data.world/api
 
@@ -403,6 +541,14 @@ def get_data(dataset_name, dataframe_name):
                     dataset which stores objects within the dataset within
                     a dictionary of dataframes in key value pair.
 
+    cache_path:       str (optional)
+                    location of the local cache file. Pass None to always
+                    request from the datadotworld service.
+
+    refresh:          Boolean (optional)
+                    set True to ignore an existing cache file and request
+                    fresh data, overwriting the cache.
+
     Returns
     -------
     Pandas Dataframe
@@ -411,11 +557,20 @@ def get_data(dataset_name, dataframe_name):
     --------
     >>> get_data(dataset_name='census2020', dataframe_name='Kansas')
 
-    >>> get_data('performance_indicators', 'public_safety')
+    >>> get_data('performance_indicators', 'public_safety', refresh=True)
     """
+    if cache_path and not refresh and os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+
     dataworld_obj = dw.load_dataset(dataset_name)
     dataframe = dataworld_obj.dataframes[dataframe_name]
 
+    if cache_path:
+        try:
+            dataframe.to_pickle(cache_path)
+        except Exception as e:
+            print(e)  # convert to log
+
     return dataframe
 
 
@@ -450,14 +605,62 @@ def clean_data(dframe):
 
     if isinstance(dframe, pd.core.frame.DataFrame):
         try:
-            dframe = dframe[target_columns][(dframe['prob_type'] != 'TEST(DO NOT USE)')]
-            dframe['date_completed'] = pd.to_datetime(dframe['date_completed'])
-            dframe['date_requested'] = pd.to_datetime(dframe['date_requested'])
+            ## build the row mask on the single column first and select
+            ## rows and columns through one .loc call; the old chained
+            ## [][] form materialized the full wide frame and then
+            ## masked that copy a second time
+            mask = (dframe['prob_type'] != 'TEST(DO NOT USE)').values
+            dframe = dframe.loc[mask, target_columns].copy()
+
+            ## low cardinality string columns carry repeated values on
+            ## every row; categorical dtype stores them once as integer
+            ## codes which shrinks the frame and speeds up groupby/isin
+            for column in ['prob_type', 'bl_id', 'completed_by']:
+                dframe[column] = dframe[column].astype('category')
+
+            ## infer the datetime format from the first value and reuse
+            ## it for the rest of the column, with a cache of previously
+            ## parsed strings, instead of re-inferring per row; coerce
+            ## turns unparseable values into NaT which downstream
+            ## remove_open_workorders already filters out
+            for column in ['date_completed', 'date_requested']:
+                dframe[column] = pd.to_datetime(dframe[column],
+                                                infer_datetime_format=True,
+                                                cache=True, errors='coerce')
             dframe.set_index('date_requested', inplace=True)
-            dframe['duration'] = dframe['date_completed'] - dframe.index
-            dframe['fiscal_year_requested'] = get_fiscalyear(dframe.index)
-            dframe['fiscal_year_completed'] = get_fiscalyear(dframe['date_completed'])
-            dframe.sort_index(inplace=True)
+
+            ## integer day counts taken straight off the int64 nanosecond
+            ## arrays so ontime can skip the .dt.days round trip; -1
+            ## marks workorders still open, keeping the column a compact
+            ## int32 instead of promoting to float for NaN
+            requested_i64 = dframe.index.asi8
+            completed_i64 = dframe['date_completed'].values.view('i8')
+            nat = np.iinfo(np.int64).min
+            duration_days = np.where(
+                completed_i64 == nat, -1,
+                (completed_i64 - requested_i64) // 86_400_000_000_000
+                ).astype(np.int32)
+
+            ## both fiscal year columns follow the same month >= start
+            ## rule, so one fused kernel produces the pair in a single
+            ## np.where pass; open workorders keep the -1 sentinel
+            fiscal_year_requested, fiscal_year_completed = _fiscal_years(
+                dframe.index, dframe['date_completed'])
+
+            ## attach every engineered column in one assign so the frame
+            ## consolidates its blocks once rather than on each separate
+            ## column insertion
+            dframe = dframe.assign(
+                duration=dframe['date_completed'] - dframe.index,
+                duration_days=duration_days,
+                fiscal_year_requested=fiscal_year_requested,
+                fiscal_year_completed=fiscal_year_completed)
+
+            ## the source export usually arrives in request date order;
+            ## checking monotonicity is O(N) and skips the O(N log N)
+            ## shuffle of every column when the index is already sorted
+            if not dframe.index.is_monotonic_increasing:
+                dframe.sort_index(inplace=True)
 
             status = 'Pass'
         except Exception as e:
@@ -497,17 +700,25 @@ def make_map_dframe(dframe, excelfile, skipnrows=6):
 
     """
 
-    df = pd.read_excel(excelfile, skiprows=skipnrows)
+    ## restrict the parse to the six columns the lookup actually uses so
+    ## stray spreadsheet columns are never converted to python objects
+    df = pd.read_excel(excelfile, skiprows=skipnrows, usecols='A:F')
     df.columns = ['bl_id','name','addr','site_id','latitude','longitude']
-    geo_dict = {}
-    for bld in df['bl_id'].unique():
-        geo_dict[bld] = {'latitude': df.loc[df['bl_id'] == bld]['latitude'].values[0],
-                        'longitude': df.loc[df['bl_id'] == bld]['longitude'].values[0],
-                        'bld_name': df.loc[df['bl_id'] == bld]['name'].values[0]}
 
-    dframe['latitude'] = dframe['bl_id'].apply(lambda x: geo_dict[x]['latitude'])
-    dframe['longitude'] = dframe['bl_id'].apply(lambda x: geo_dict[x]['longitude'])
-    dframe['bld_name'] = dframe['bl_id'].apply(lambda x: geo_dict[x]['bld_name'])
+    ## one lookup row per building keyed on bl_id lets pandas attach the
+    ## latitude, longitude and name columns in a single C-level hash join
+    ## instead of per-row apply calls against a Python dict
+    lookup = (df.drop_duplicates('bl_id')
+              .set_index('bl_id')[['latitude','longitude','name']]
+              .rename(columns={'name':'bld_name'}))
+    dframe = dframe.join(lookup, on='bl_id')
+
+    ## the join broadcasts a few dozen building values onto every row;
+    ## float32 is plenty for the ~6 decimal places map markers use and
+    ## category codes replace the repeated building name strings
+    dframe['latitude'] = dframe['latitude'].astype('float32')
+    dframe['longitude'] = dframe['longitude'].astype('float32')
+    dframe['bld_name'] = dframe['bld_name'].astype('category')
 
     return dframe
 
@@ -527,10 +738,39 @@ map_dframe = make_map_dframe(
     dframe=dframe, excelfile='data/building_lat_longs.xlsx')
 
 
-preventative_types = ['PREVENTIVE MAINT','HVAC|PM']
-corrective_types = ['BOILER','CHILLERS','COOLING TOWERS','HVAC',
-                   'HVAC INFRASTRUCTURE','HVAC|REPAIR']
+preventative_types = frozenset(['PREVENTIVE MAINT','HVAC|PM'])
+corrective_types = frozenset(['BOILER','CHILLERS','COOLING TOWERS','HVAC',
+                              'HVAC INFRASTRUCTURE','HVAC|REPAIR'])
+
+hvac_types = preventative_types | corrective_types
+
+
+## precomputed category codes for the hvac problem types; prob_type is
+## categorical so membership can be tested against its integer codes in
+## C rather than hashing the type strings row by row
+_prob_categories = dframe['prob_type'].cat.categories
+hvac_codes = np.array([_prob_categories.get_loc(ptype)
+                       for ptype in sorted(hvac_types)
+                       if ptype in _prob_categories], dtype=np.int16)
+
+
+def is_hvac(dataframe):
+    """Return boolean array flagging rows with an HVAC problem type.
 
-hvac_types = ['PREVENTIVE MAINT','HVAC|PM','BOILER','CHILLERS',
-              'COOLING TOWERS','HVAC','HVAC INFRASTRUCTURE',
-              'HVAC|REPAIR' ]
+    Parameters
+    ----------
+    dataframe:   Pandas Dataframe
+            Expects a dataframe from clean_data where 'prob_type' holds
+            category dtype, such as the module level dframe or any
+            filtered view of it.
+
+    Returns
+    -------
+    Numpy Array:  Boolean array, same length as dataframe, True where the
+                  row's problem type is one of hvac_types.
+
+    Example
+    -------
+    >>> dframe[is_hvac(dframe)]  # hvac workorders only
+    """
+    return np.isin(dataframe['prob_type'].cat.codes.values, hvac_codes)